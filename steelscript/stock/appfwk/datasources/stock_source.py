@@ -31,6 +31,7 @@ from steelscript.appfwk.apps.datasource.forms import (
     DateTimeField, ReportSplitDateWidget)
 
 from steelscript.stock.core.app import get_historical_prices
+from steelscript.stock.core.compact import PAYLOAD_COLUMN, to_compact_frame
 from steelscript.appfwk.apps.jobs import \
     QueryComplete
 
@@ -122,12 +123,19 @@ class SingleStockTable(StockTable):
 class MultiStockTable(StockTable):
     """Table class associated with report showing close prices
     for the given date range for input multiple stocks.
+
+    With ``compact=True`` the table returns a single row holding the
+    first date and a 'payload' column with the columnar encoding from
+    steelscript.stock.core.compact, instead of one column per ticker.
+    Such tables are meant for API clients, which decode the job data
+    with ``from_compact_frame``.
     """
     class Meta:
         proxy = True
         app_label = APP_LABEL
 
-    TABLE_OPTIONS = {'stock_symbol': None}
+    TABLE_OPTIONS = {'stock_symbol': None,
+                     'compact': False}
 
     def post_process_table(self, field_options):
         super(MultiStockTable, self).post_process_table(field_options)
@@ -211,16 +219,34 @@ class MultiStockQuery(StockQuery):
             if not c.iskey:
                 c.delete()
 
-        for ticker in self.symbol.split(","):
-            # strip white spaces
-            ticker = ticker.strip().lower()
-            if ticker not in map(lambda x: x.name, self.table.get_columns()):
+        # strip white spaces
+        tickers = [t.strip().lower() for t in self.symbol.split(",")]
+        if measure is None:
+            measure = "close"
+
+        compact = self.table.options.compact
+        if compact:
+            StockColumn.create(self.table, PAYLOAD_COLUMN, 'Payload',
+                               datatype='string')
+
+        for i, ticker in enumerate(tickers):
+            if (not compact and ticker not in
+                    map(lambda x: x.name, self.table.get_columns())):
                 StockColumn.create(self.table, ticker, ticker.upper())
-            if measure is None:
-                measure = "close"
             history = self.get_data(ticker, [measure], date_obj=True)
             history.rename(columns={measure: ticker}, inplace=True)
             self.merge_price_history(history)
+
+            # Publish progress as each symbol's history is merged so
+            # the job status advances per ticker instead of jumping
+            # from 0 to 100 once the slowest symbol has been fetched.
+            # Stop short of 100 and leave that to job completion.
+            self.job.mark_progress(int(99.0 * (i + 1) / len(tickers)))
+
+        if compact:
+            # Volumes are whole numbers, prices always encode as floats
+            dtype = 'int' if measure == 'volume' else 'float'
+            return QueryComplete(to_compact_frame(self.data, dtype=dtype))
         return QueryComplete(self.data)
 
 
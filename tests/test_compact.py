@@ -0,0 +1,95 @@
+# Copyright (c) 2015 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import json
+import datetime
+import unittest
+
+import numpy
+import pandas
+
+from steelscript.stock.core.compact import (encode_compact, decode_compact,
+                                            to_compact_frame,
+                                            from_compact_frame)
+
+NAN = float('nan')
+INF = float('inf')
+
+
+def roundtrip(df, dtype='float'):
+    return decode_compact(json.loads(json.dumps(encode_compact(df,
+                                                               dtype=dtype))))
+
+
+class CompactEncodingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = [datetime.datetime(2015, 3, d)
+                      for d in (2, 3, 4, 5, 6, 9)]
+        self.prices = pandas.DataFrame(
+            {'date': self.dates,
+             'aapl': [128.46, NAN, NAN, 126.6, 126.41, NAN],
+             'goog': [571.0, 573.0, 573.0, 575.0, 577.0, 568.0]},
+            columns=['date', 'aapl', 'goog'])
+        self.volumes = pandas.DataFrame(
+            {'date': self.dates,
+             'aapl': [48096700, 51054100, 42189400,
+                      38362600, 56754500, 38512200]},
+            columns=['date', 'aapl'])
+
+    def test_prices(self):
+        payload = encode_compact(self.prices)
+        self.assertEqual(payload['columns'][0]['nan_runs'], [[1, 2], [5, 1]])
+
+        out = roundtrip(self.prices)
+        self.assertEqual(list(out['date']), self.dates)
+        numpy.testing.assert_allclose(out['aapl'], self.prices['aapl'],
+                                      rtol=1e-6)
+
+        # Whole number prices still decode as floats
+        self.assertEqual(payload['columns'][1]['dtype'], 'float')
+        self.assertEqual(out['goog'].dtype, numpy.float64)
+
+    def test_volumes(self):
+        out = roundtrip(self.volumes, 'int')
+        self.assertEqual(out['aapl'].dtype, numpy.int64)
+        self.assertEqual(list(out['aapl']), list(self.volumes['aapl']))
+
+        self.volumes.loc[2, 'aapl'] = NAN
+        out = roundtrip(self.volumes, 'int')
+        numpy.testing.assert_array_equal(out['aapl'], self.volumes['aapl'])
+
+    def test_empty(self):
+        df = pandas.DataFrame({'date': [], 'aapl': []})
+        out = roundtrip(df)
+        self.assertEqual(len(out), 0)
+        self.assertEqual(list(out.columns), ['date', 'aapl'])
+
+    def test_non_finite(self):
+        self.prices['aapl'] = [1.5, INF, -INF, NAN, 1e20, INF]
+        out = roundtrip(self.prices)
+        numpy.testing.assert_array_equal(out['aapl'], self.prices['aapl'])
+
+        self.volumes['aapl'] = [1.0, 2.0, INF, 3.0, -INF, 4.0]
+        out = roundtrip(self.volumes, 'int')
+        numpy.testing.assert_array_equal(out['aapl'], self.volumes['aapl'])
+
+        self.volumes['aapl'] = [1e20, 2.0, 3.0, 4.0, 5.0, 6.0]
+        self.assertRaises(ValueError, encode_compact, self.volumes,
+                          dtype='int')
+
+    def test_compact_frame(self):
+        frame = to_compact_frame(self.prices)
+        self.assertEqual(list(frame.columns), ['date', 'payload'])
+        self.assertEqual(frame['date'].iloc[0], self.dates[0])
+        for result in (frame, frame.to_dict('records')):
+            out = from_compact_frame(result)
+            numpy.testing.assert_allclose(out['aapl'], self.prices['aapl'],
+                                          rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
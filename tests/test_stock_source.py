@@ -0,0 +1,94 @@
+# Copyright (c) 2015 Riverbed Technology, Inc.
+#
+# This software is licensed under the terms and conditions of the MIT License
+# accompanying the software ("License").  This software is distributed "AS IS"
+# as set forth in the License.
+
+import datetime
+import unittest
+
+import pandas
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy
+
+from steelscript.stock.core.compact import from_compact_frame
+
+try:
+    from steelscript.stock.appfwk.datasources import stock_source
+except ImportError:
+    stock_source = None
+
+
+class StubOptions(object):
+    compact = False
+
+
+class StubTable(object):
+    def __init__(self):
+        self.options = StubOptions()
+
+    def get_columns(self):
+        return []
+
+
+class StubJob(object):
+    def __init__(self):
+        self.progress = []
+
+    def mark_progress(self, progress):
+        self.progress.append(progress)
+
+
+def stub_get_data(symbol, measures, date_obj=False):
+    dates = [datetime.datetime(2015, 3, d) for d in (2, 3, 4)]
+    data = dict((m, [10.0, 11.0, 12.0]) for m in measures)
+    data['date'] = dates
+    return pandas.DataFrame(data, columns=['date'] + measures)
+
+
+@unittest.skipIf(stock_source is None, 'steelscript.appfwk not installed')
+class MultiStockQueryTest(unittest.TestCase):
+
+    def make_query(self, cls, symbol):
+        query = cls.__new__(cls)
+        query.table = StubTable()
+        query.job = StubJob()
+        query.symbol = symbol
+        query.data = None
+        query.get_data = stub_get_data
+        return query
+
+    def run_query(self, query, *args):
+        with mock.patch.object(stock_source.StockColumn, 'create'):
+            return query.run_query(*args)
+
+    def test_progress_per_ticker(self):
+        query = self.make_query(stock_source.MultiStockPriceQuery,
+                                'aapl, goog, msft')
+        self.run_query(query)
+        self.assertEqual(query.job.progress, [33, 66, 99])
+        self.assertEqual(list(query.data.columns),
+                         ['date', 'aapl', 'goog', 'msft'])
+
+    def test_compact(self):
+        query = self.make_query(stock_source.MultiStockVolumeQuery,
+                                'aapl, goog')
+        query.table.options.compact = True
+        result = self.run_query(query, 'volume')
+
+        self.assertEqual(list(result.data.columns), ['date', 'payload'])
+        self.assertEqual(result.data['date'].iloc[0],
+                         datetime.datetime(2015, 3, 2))
+        out = from_compact_frame(result.data)
+        self.assertEqual(list(out.columns), ['date', 'aapl', 'goog'])
+        self.assertEqual(out['aapl'].dtype, numpy.int64)
+        self.assertEqual(query.job.progress, [49, 99])
+
+
+if __name__ == '__main__':
+    unittest.main()